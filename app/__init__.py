@@ -1,17 +1,29 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from config import settings
-from app.database import create_tables
-from app.api import auth, documents, users, categories
 
 def create_app() -> FastAPI:
     """创建FastAPI应用"""
+    # 路由及其依赖（ORM模型、数据库引擎、passlib、jose）在创建应用时才导入，
+    # 仅导入 app 包的脚本和测试无需承担这部分开销
+    from app.database import check_tables
+    from app.api import auth, documents, users, categories
+    
+    # 生产环境可关闭API文档，不注册 /openapi.json、/docs、/redoc
+    docs_options = {} if settings.enable_docs else {
+        "openapi_url": None,
+        "docs_url": None,
+        "redoc_url": None,
+    }
+    
     app = FastAPI(
         title=settings.app_name,
         description="基于FastAPI的Markdown管理后台",
         version="1.0.0",
-        debug=settings.debug
+        debug=settings.debug,
+        default_response_class=ORJSONResponse,  # 使用orjson序列化响应，大列表明显快于标准库json
+        **docs_options
     )
     
     # 配置CORS
@@ -33,9 +45,12 @@ def create_app() -> FastAPI:
     async def startup_event():
         """应用启动事件"""
         print("FastAPI应用启动中...")
-        # 创建数据库表
-        create_tables()
-        print("数据库表创建完成")
+        # 建表在部署时通过 python -m app.manage migrate 完成，这里只检查表是否存在
+        missing_tables = check_tables()
+        if missing_tables:
+            print(f"警告: 数据库缺少表 {', '.join(missing_tables)}，请先执行 python -m app.manage migrate")
+        else:
+            print("数据库表检查完成")
     
     @app.get("/")
     async def root():
@@ -1,25 +1,57 @@
-from datetime import datetime, timedelta
+from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import or_
 from sqlalchemy.orm import Session
+from config import settings
 from app.database import get_db
-from app.models import User
+from app.models import User, utcnow
 from app.schemas import UserCreate, UserResponse, Token, LoginRequest, MessageResponse, UserUpdate
 from app.auth import create_access_token, get_current_user
 
 router = APIRouter()
 
+# 是否已存在用户（决定首个注册用户是否为管理员）
+# 只缓存"已有用户"：否定结果可能因本进程提交失败、其他进程先建了用户而过期
+_first_user_exists: bool = False
+
+def _is_bootstrap_admin(db: Session, username: str) -> bool:
+    """新注册用户是否应设为管理员
+    
+    配置了 admin_bootstrap_usernames 时只按名单判断，不访问数据库；
+    否则第一个注册的用户成为管理员（确认已有用户后不再探测）。
+    """
+    global _first_user_exists
+    
+    if settings.admin_bootstrap_usernames:
+        return username in settings.admin_bootstrap_usernames
+    
+    if not _first_user_exists:
+        _first_user_exists = db.query(User.id).limit(1).first() is not None
+    return not _first_user_exists
+
+def _mark_user_created() -> None:
+    """用户创建后，后续注册无需再探测首个用户"""
+    global _first_user_exists
+    _first_user_exists = True
+
 @router.post("/auth/register", response_model=MessageResponse, status_code=status.HTTP_201_CREATED)
-async def register(user_data: UserCreate, db: Session = Depends(get_db)):
+def register(user_data: UserCreate, db: Session = Depends(get_db)):
     """用户注册"""
-    # 检查用户名是否已存在
-    if db.query(User).filter(User.username == user_data.username).first():
+    # 一次查询同时检查用户名和邮箱是否已存在（两列均有唯一索引）；
+    # 哪一列冲突以数据库按排序规则的判断为准（不区分大小写和重音），不在Python里重新比较
+    conflicts = db.query(
+        (User.username == user_data.username).label('username_taken')
+    ).filter(
+        or_(User.username == user_data.username, User.email == user_data.email)
+    ).limit(2).all()
+    
+    if any(row.username_taken for row in conflicts):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="用户名已存在"
         )
     
-    # 检查邮箱是否已存在
-    if db.query(User).filter(User.email == user_data.email).first():
+    if conflicts:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="邮箱已存在"
@@ -32,13 +64,13 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     )
     user.set_password(user_data.password)
     
-    # 第一个用户设为管理员
-    if db.query(User).count() == 0:
+    # 管理员引导：名单内用户或第一个用户设为管理员
+    if _is_bootstrap_admin(db, user_data.username):
         user.is_admin = True
     
     db.add(user)
     db.commit()
-    db.refresh(user)
+    _mark_user_created()
     
     return MessageResponse(
         message="注册成功",
@@ -46,7 +78,7 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     )
 
 @router.post("/auth/login", response_model=Token)
-async def login(login_data: LoginRequest, db: Session = Depends(get_db)):
+def login(login_data: LoginRequest, db: Session = Depends(get_db)):
     """用户登录"""
     user = db.query(User).filter(User.username == login_data.username).first()
     
@@ -56,6 +88,10 @@ async def login(login_data: LoginRequest, db: Session = Depends(get_db)):
             detail="用户名或密码错误"
         )
     
+    # 旧的bcrypt哈希在验证时已升级，保存新哈希
+    if user in db.dirty:
+        db.commit()
+    
     # 生成访问令牌
     access_token_expires = timedelta(hours=24)
     access_token = create_access_token(
@@ -71,7 +107,7 @@ async def get_profile(current_user: User = Depends(get_current_user)):
     return UserResponse.from_orm(current_user)
 
 @router.put("/auth/profile", response_model=MessageResponse)
-async def update_profile(
+def update_profile(
     user_update: UserUpdate,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -79,7 +115,7 @@ async def update_profile(
     """更新用户资料"""
     if user_update.username:
         # 检查用户名是否已被其他用户使用
-        existing_user = db.query(User).filter(
+        existing_user = db.query(User.id).filter(
             User.username == user_update.username,
             User.id != current_user.id
         ).first()
@@ -92,7 +128,7 @@ async def update_profile(
     
     if user_update.email:
         # 检查邮箱是否已被其他用户使用
-        existing_user = db.query(User).filter(
+        existing_user = db.query(User.id).filter(
             User.email == user_update.email,
             User.id != current_user.id
         ).first()
@@ -106,9 +142,8 @@ async def update_profile(
     if user_update.password:
         current_user.set_password(user_update.password)
     
-    current_user.updated_at = datetime.utcnow()
+    current_user.updated_at = utcnow()
     db.commit()
-    db.refresh(current_user)
     
     return MessageResponse(
         message="资料更新成功",
@@ -1,44 +1,106 @@
+import time
+import zlib
 from datetime import datetime
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, Query
+from sqlalchemy import lambda_stmt, select
 from sqlalchemy.orm import Session
+from config import settings
 from app.database import get_db
 from app.models import Category, Document
-from app.schemas import CategoryCreate, CategoryUpdate, CategoryResponse, MessageResponse, PaginationParams, PaginatedResponse
+from app.schemas import CATEGORY_LIST_ADAPTER, CategoryCreate, CategoryUpdate, CategoryResponse, MessageResponse, PaginationParams, PaginatedResponse
 from app.auth import get_current_admin_user
+from app.api.conditional import is_not_modified, not_modified_response, set_validators, weak_etag
+from app.api.pagination import document_list_query, paginate_documents
 
 router = APIRouter()
 
+# 分类读接口的进程内缓存: key -> (写入时间, 值)，分类写操作后整体清空
+_category_cache: Dict[Any, Tuple[float, Any]] = {}
+
+def _cached_category_read(key: Any, loader: Callable[[], Any]) -> Any:
+    """读取分类缓存，过期后重新加载；重新加载失败时退回使用过期数据"""
+    ttl = settings.category_cache_ttl
+    entry = _category_cache.get(key)
+    now = time.monotonic()
+    if entry and now - entry[0] < ttl:
+        return entry[1]
+    
+    try:
+        value = loader()
+    except HTTPException:
+        raise
+    except Exception:
+        if entry:
+            return entry[1]
+        raise
+    
+    if ttl > 0:
+        _category_cache[key] = (now, value)
+    return value
+
+def _invalidate_category_cache() -> None:
+    """分类数据变更后清空缓存"""
+    _category_cache.clear()
+
+def _set_cache_headers(response: Response) -> None:
+    """允许浏览器/CDN在缓存时间内复用分类响应"""
+    if settings.category_cache_ttl > 0:
+        response.headers["Cache-Control"] = f"public, max-age={settings.category_cache_ttl}"
+
 @router.get("/categories", response_model=List[CategoryResponse])
-async def get_categories(db: Session = Depends(get_db)):
+def get_categories(response: Response, db: Session = Depends(get_db)):
     """获取分类列表"""
-    categories = db.query(Category).all()
-    return [CategoryResponse.from_orm(cat) for cat in categories]
+    def load():
+        categories = db.query(Category).all()
+        return CATEGORY_LIST_ADAPTER.validate_python(categories, from_attributes=True)
+    
+    categories = _cached_category_read("list", load)
+    _set_cache_headers(response)
+    return categories
 
 @router.get("/categories/{category_id}", response_model=CategoryResponse)
-async def get_category(category_id: int, db: Session = Depends(get_db)):
-    """获取分类详情"""
-    category = db.query(Category).filter(Category.id == category_id).first()
-    if not category:
-        raise HTTPException(status_code=404, detail="分类不存在")
+def get_category(
+    category_id: int,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db)
+):
+    """获取分类详情（支持 ETag 条件请求）"""
+    def load():
+        stmt = lambda_stmt(lambda: select(Category).where(Category.id == category_id))
+        category = db.execute(stmt).scalars().first()
+        if not category:
+            raise HTTPException(status_code=404, detail="分类不存在")
+        return CategoryResponse.from_orm(category)
+    
+    category = _cached_category_read(("detail", category_id), load)
     
-    return CategoryResponse.from_orm(category)
+    # 分类没有更新时间字段，用可变字段的校验和作为版本
+    version = zlib.crc32(f"{category.name}\x00{category.description or ''}".encode())
+    etag = weak_etag(category.id, version)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    
+    set_validators(response, etag)
+    _set_cache_headers(response)
+    return category
 
 @router.post("/categories", response_model=MessageResponse, status_code=status.HTTP_201_CREATED)
-async def create_category(
+def create_category(
     category_data: CategoryCreate,
     current_user = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
     """创建分类（仅管理员）"""
     # 检查分类名是否已存在
-    if db.query(Category).filter(Category.name == category_data.name).first():
+    if db.query(Category.id).filter(Category.name == category_data.name).first():
         raise HTTPException(status_code=400, detail="分类名已存在")
     
     category = Category(**category_data.dict())
     db.add(category)
     db.commit()
-    db.refresh(category)
+    _invalidate_category_cache()
     
     return MessageResponse(
         message="分类创建成功",
@@ -46,7 +108,7 @@ async def create_category(
     )
 
 @router.put("/categories/{category_id}", response_model=MessageResponse)
-async def update_category(
+def update_category(
     category_id: int,
     category_update: CategoryUpdate,
     current_user = Depends(get_current_admin_user),
@@ -59,7 +121,7 @@ async def update_category(
     
     # 检查分类名是否已被其他分类使用
     if category_update.name:
-        existing_category = db.query(Category).filter(
+        existing_category = db.query(Category.id).filter(
             Category.name == category_update.name,
             Category.id != category_id
         ).first()
@@ -71,7 +133,7 @@ async def update_category(
         category.description = category_update.description
     
     db.commit()
-    db.refresh(category)
+    _invalidate_category_cache()
     
     return MessageResponse(
         message="分类更新成功",
@@ -79,7 +141,7 @@ async def update_category(
     )
 
 @router.delete("/categories/{category_id}", response_model=MessageResponse)
-async def delete_category(
+def delete_category(
     category_id: int,
     current_user = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
@@ -90,43 +152,35 @@ async def delete_category(
         raise HTTPException(status_code=404, detail="分类不存在")
     
     # 检查是否有文档使用此分类
-    if db.query(Document).filter(Document.category_id == category_id).first():
+    if db.query(Document.id).filter(Document.category_id == category_id).first():
         raise HTTPException(status_code=400, detail="该分类下还有文档，无法删除")
     
     db.delete(category)
     db.commit()
+    _invalidate_category_cache()
     
     return MessageResponse(message="分类删除成功")
 
 @router.get("/categories/{category_id}/documents", response_model=PaginatedResponse)
-async def get_category_documents(
+def get_category_documents(
     category_id: int,
     page: int = Query(1, ge=1, description="页码"),
     per_page: int = Query(10, ge=1, le=100, description="每页数量"),
+    cursor: Optional[str] = Query(None, description="分页游标（上一页返回的next_cursor），传入时忽略page"),
+    with_total: bool = Query(False, description="是否返回总数（需额外统计全部匹配行）"),
     db: Session = Depends(get_db)
 ):
     """获取分类下的文档"""
-    category = db.query(Category).filter(Category.id == category_id).first()
-    if not category:
-        raise HTTPException(status_code=404, detail="分类不存在")
-    
-    query = db.query(Document).filter(
+    query = document_list_query(db).filter(
         Document.category_id == category_id,
         Document.status == 1,  # published
         Document.deleted_at.is_(None)
-    ).order_by(Document.created_at.desc())
+    )
     
-    # 分页
-    total = query.count()
-    documents = query.offset((page - 1) * per_page).limit(per_page).all()
+    result = paginate_documents(query, page, per_page, cursor, with_total)
     
-    pages = (total + per_page - 1) // per_page
+    # 查到文档即说明分类存在（外键约束），只有结果为空时才需确认分类是否存在
+    if not result.items and not db.query(Category.id).filter(Category.id == category_id).first():
+        raise HTTPException(status_code=404, detail="分类不存在")
     
-    from app.schemas import DocumentResponse
-    return PaginatedResponse(
-        items=[DocumentResponse.from_orm(doc) for doc in documents],
-        total=total,
-        pages=pages,
-        current_page=page,
-        per_page=per_page
-    )
+    return result
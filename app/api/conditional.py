@@ -0,0 +1,51 @@
+"""条件请求（ETag / Last-Modified）工具"""
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request, Response
+
+
+def weak_etag(*parts) -> str:
+    """由资源标识和版本信息生成弱ETag"""
+    return 'W/"' + '-'.join(str(part) for part in parts) + '"'
+
+def _to_utc(value: datetime) -> datetime:
+    """数据库中的时间按UTC存储，无时区信息时按UTC处理"""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """客户端缓存是否仍然有效（If-None-Match 优先于 If-Modified-Since）"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        candidates = [tag.strip() for tag in if_none_match.split(",")]
+        # 弱比较：忽略 W/ 前缀
+        plain = etag[2:] if etag.startswith("W/") else etag
+        return "*" in candidates or any(
+            (tag[2:] if tag.startswith("W/") else tag) == plain for tag in candidates
+        )
+    
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        # HTTP日期只精确到秒
+        return _to_utc(last_modified).replace(microsecond=0) <= _to_utc(since)
+    
+    return False
+
+def set_validators(response: Response, etag: str, last_modified: Optional[datetime] = None) -> None:
+    """在响应上设置 ETag / Last-Modified"""
+    response.headers["ETag"] = etag
+    if last_modified is not None:
+        response.headers["Last-Modified"] = format_datetime(_to_utc(last_modified), usegmt=True)
+
+def not_modified_response(etag: str, last_modified: Optional[datetime] = None) -> Response:
+    """304响应，不含响应体"""
+    response = Response(status_code=304)
+    set_validators(response, etag, last_modified)
+    return response
@@ -1,38 +1,201 @@
-from datetime import datetime, timezone
-from typing import List, Optional
+import codecs
+import re
+import time
+import zlib
+from typing import Dict, List, Optional
 
+import orjson
 from fastapi import (APIRouter, Depends, File, Form, HTTPException, Query,
-                     UploadFile, status)
-from sqlalchemy.orm import Session
-from sqlalchemy import text
+                     Request, Response, UploadFile, status)
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Query as ORMQuery, Session, defer, selectinload
+from sqlalchemy import func, lambda_stmt, or_, select, text
+from sqlalchemy.dialects.mysql import insert as mysql_insert
 
+from config import settings
 # 个人使用版本，无需认证
-from app.database import get_db
-from app.models import Document, User
+from app.api.conditional import (is_not_modified, not_modified_response,
+                                 set_validators, weak_etag)
+from app.api.pagination import document_list_query, paginate_documents
+from app.database import get_db, supports_window_functions
+from app.models import Document, User, utcnow
 from app.schemas import (DocumentCreate, DocumentResponse, DocumentUpdate,
                          MessageResponse, PaginatedResponse,
                          DocumentSearchResponse, DocumentSearchResult, SearchHighlight)
 
 router = APIRouter()
 
-def _generate_highlights(document: Document, search_term: str) -> SearchHighlight:
-    """生成搜索结果高亮"""
-    import re
+# 上传文件分块读取的块大小
+_UPLOAD_CHUNK_SIZE = 1 << 20
+
+# 已占用slug末尾的数字后缀
+_SLUG_SUFFIX_RE = re.compile(r'-(\d+)$')
+
+# 由标题生成slug时，空格和下划线替换为连字符
+_SLUG_TRANS = str.maketrans({' ': '-', '_': '-'})
+
+# 生成内容预览时去除HTML标签
+_HTML_TAG_RE = re.compile(r'<[^>]+>')
+# 全文索引 ngram 分词器的分词长度（ngram_token_size 默认值），
+# ngram 索引不受 innodb_ft_min_token_size 影响，比它短的词只能按前缀匹配
+_FT_NGRAM_TOKEN_SIZE = 2
+# 布尔模式下有特殊含义的字符，用户输入中的这些字符按分隔符处理
+_FT_OPERATOR_RE = re.compile(r'[+\-<>()~*"@]+')
+
+# 截取窗口时被切断在开头/结尾的半个标签
+_HEAD_PARTIAL_TAG_RE = re.compile(r'^[^<]*?>')
+_TAIL_PARTIAL_TAG_RE = re.compile(r'<[^>]*$')
+
+# 系统内置用户（default_user / chrome_plugin_user）的id，首次查询（或创建）后缓存，后续请求不再查询用户表
+_system_user_ids: Dict[str, int] = {}
+
+# 内置用户: 用户名 -> (邮箱, 初始密码)
+_SYSTEM_USERS = {
+    "default_user": ("default@example.com", "default_password_123"),
+    "chrome_plugin_user": ("chrome_plugin@example.com", "chrome_plugin_password_123"),
+}
+
+def document_query(db: Session) -> ORMQuery:
+    """预加载作者和分类的实体查询，供搜索的LIKE模式使用
+    
+    搜索结果需要完整的 Document 实体来生成高亮预览，作者名和分类名经由关联读取；
+    每个关联只额外发出一条 IN 查询，避免逐行懒加载的 N+1。
+    列表接口改用 document_list_query 的列查询。
+    """
+    return db.query(Document).options(
+        selectinload(Document.author),
+        selectinload(Document.category)
+    )
+
+def _get_system_user_id(db: Session, username: str) -> int:
+    """获取（不存在时创建）内置用户的id，结果在进程内缓存（只在进程内首次调用时访问数据库）"""
+    user_id = _system_user_ids.get(username)
+    if user_id is not None:
+        return user_id
+    
+    # 一条语句完成“不存在则创建”：用户名已存在时不修改数据，
+    # 通过 LAST_INSERT_ID(id) 让 lastrowid 返回已有用户的id，没有先查后插的竞争
+    email, password = _SYSTEM_USERS[username]
+    user = User(username=username, email=email, is_admin=False)
+    user.set_password(password)
+    stmt = mysql_insert(User).values(
+        username=username,
+        email=email,
+        password_hash=user.password_hash,
+        is_admin=False
+    ).on_duplicate_key_update(id=func.last_insert_id(User.id))
+    user_id = db.execute(stmt).lastrowid
+    db.commit()
     
-    def highlight_text(text: str, term: str, max_length: int = 200) -> str:
-        if not text or not term:
-            return text
-        
-        # 创建不区分大小写的正则表达式
-        pattern = re.compile(re.escape(term), re.IGNORECASE)
-        
-        # 找到匹配位置
-        matches = list(pattern.finditer(text))
-        if not matches:
+    # 任一唯一键冲突都会触发 ON DUPLICATE KEY：邮箱被其他用户占用时返回的是那个用户的id，
+    # 必须确认返回行确实是该内置用户，不能把文档记到别人名下
+    is_system_user = db.query(User.id).filter(
+        User.id == user_id, User.username == username
+    ).first() is not None
+    if not is_system_user:
+        raise HTTPException(
+            status_code=500,
+            detail=f"内置用户 {username} 的邮箱 {email} 已被其他用户占用"
+        )
+    
+    _system_user_ids[username] = user_id
+    return user_id
+
+def _slugify(title: str) -> str:
+    """由标题生成基础slug"""
+    return title.lower().translate(_SLUG_TRANS)
+
+def _load_relations(db: Session, document: Document) -> Document:
+    """写操作后加载响应需要的作者和分类（两个关系为 lazy="raise"，必须显式加载）"""
+    db.refresh(document, attribute_names=['author', 'category'])
+    return document
+
+def _allocate_unique_slug(db: Session, base_slug: str, exclude_id: Optional[int] = None) -> str:
+    """一次查询取出所有可能冲突的slug，在内存中计算下一个可用后缀
+    
+    是否冲突完全以数据库的判断为准（排序规则不区分大小写、重音和全半角），
+    不在Python里重新比较字符串：等值条件命中的行说明基础slug已被占用，
+    其余命中行以 -N 结尾则说明后缀 N 已被占用。
+    exclude_id 为正在更新的文档id，其自身的slug不算冲突。
+    """
+    escaped = base_slug.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    query = db.query(Document.slug, (Document.slug == base_slug).label('is_base')).filter(
+        or_(Document.slug == base_slug, Document.slug.like(f"{escaped}-%", escape='\\'))
+    )
+    if exclude_id is not None:
+        query = query.filter(Document.id != exclude_id)
+    
+    base_taken = False
+    taken_suffixes = set()
+    for row in query.all():
+        if row.is_base:
+            base_taken = True
+        suffix = _SLUG_SUFFIX_RE.search(row.slug)
+        if suffix:
+            taken_suffixes.add(int(suffix.group(1)))
+    
+    if not base_taken:
+        return base_slug
+    
+    counter = 1
+    while counter in taken_suffixes:
+        counter += 1
+    return f"{base_slug}-{counter}"
+
+def _commit_with_unique_slug(db: Session, document: Document, base_slug: str) -> None:
+    """提交新文档；并发插入导致slug唯一约束冲突时重新分配slug并重试一次
+    
+    重新分配得到的slug与失败的相同时，说明冲突不是并发占用slug造成的，重试也不会成功，直接抛出原异常。
+    """
+    db.add(document)
+    try:
+        db.commit()
+        return
+    except IntegrityError:
+        db.rollback()
+        failed_slug = document.slug
+        document.slug = _allocate_unique_slug(db, base_slug)
+        if document.slug == failed_slug:
+            raise
+    
+    db.add(document)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="slug冲突，请稍后重试或指定其他slug")
+
+def _read_markdown_upload(file: UploadFile, max_size: int) -> str:
+    """分块读取并增量解码上传文件，超过大小上限时尽早拒绝"""
+    too_large = HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"文件过大，最大支持 {max_size} 字节"
+    )
+    if file.size is not None and file.size > max_size:
+        raise too_large
+    
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    parts = []
+    read_size = 0
+    while chunk := file.file.read(_UPLOAD_CHUNK_SIZE):
+        read_size += len(chunk)
+        if read_size > max_size:
+            raise too_large
+        parts.append(decoder.decode(chunk))
+    parts.append(decoder.decode(b'', final=True))
+    
+    return ''.join(parts)
+
+def _generate_highlights(document: Document, pattern: re.Pattern) -> SearchHighlight:
+    """生成搜索结果高亮（pattern 为本次搜索预编译的关键词正则）"""
+    
+    def highlight_text(text: str, max_length: int = 200) -> str:
+        # 找到第一个匹配位置
+        match = pattern.search(text)
+        if not match:
             return text[:max_length] + "..." if len(text) > max_length else text
         
         # 选择第一个匹配位置附近的文本
-        match = matches[0]
         start = max(0, match.start() - 50)
         end = min(len(text), match.end() + 50)
         
@@ -48,48 +211,99 @@ def _generate_highlights(document: Document, search_term: str) -> SearchHighligh
     
     highlights = SearchHighlight()
     
-    if document.title and search_term.lower() in document.title.lower():
-        highlights.title = highlight_text(document.title, search_term, 100)
+    if document.title and pattern.search(document.title):
+        highlights.title = highlight_text(document.title, 100)
     
-    if document.excerpt and search_term.lower() in document.excerpt.lower():
-        highlights.excerpt = highlight_text(document.excerpt, search_term, 200)
+    if document.excerpt and pattern.search(document.excerpt):
+        highlights.excerpt = highlight_text(document.excerpt, 200)
     
-    if document.content_text and search_term.lower() in document.content_text.lower():
-        highlights.content_preview = highlight_text(document.content_text, search_term, 300)
+    if document.content_text and pattern.search(document.content_text):
+        highlights.content_preview = highlight_text(document.content_text, 300)
     
     return highlights
 
-def _generate_content_preview(content_text: str, search_term: str, max_length: int = 200) -> str:
-    """生成内容预览"""
+def _fulltext_against(keyword: str) -> str:
+    """生成全文检索（布尔模式）的 AGAINST 表达式
+    
+    ft_docs_search 使用 ngram 分词器：自然语言模式会把词拆成各个 ngram 的并集，
+    几乎匹配所有文档；布尔模式下 ngram 把每个词转换为短语检索，
+    因此每个词都要求以短语形式出现（+"词"）。
+    比 ngram_token_size 短的词不会单独成为分词，改为前缀匹配（+词*）。
+    返回空字符串时说明关键词无法走全文索引（只有运算符），应退回LIKE搜索。
+    """
+    tokens = _FT_OPERATOR_RE.sub(' ', keyword).split()
+    return " ".join(
+        f"+{token}*" if len(token) < _FT_NGRAM_TOKEN_SIZE else f'+"{token}"'
+        for token in tokens
+    )
+
+def _strip_tags(raw: str, cut_head: bool, cut_tail: bool) -> str:
+    """移除一段原文中的HTML标签，并去掉被截断在两端的半个标签"""
+    text = _HTML_TAG_RE.sub('', raw)
+    if cut_head:
+        text = _HEAD_PARTIAL_TAG_RE.sub('', text, count=1)
+    if cut_tail:
+        text = _TAIL_PARTIAL_TAG_RE.sub('', text, count=1)
+    return text
+
+def _generate_content_preview(content_text: str, pattern: re.Pattern, max_length: int = 200,
+                              lead_pattern: Optional[re.Pattern] = None) -> str:
+    """生成内容预览
+    
+    只对关键词附近（或开头）的一段原文移除HTML标签，不处理整篇正文；
+    窗口两侧多留余量以容纳被移除的标签，余量不够时再退回整篇处理。
+    lead_pattern 为多词关键词的第一个词：原文中找不到整个关键词但能找到它时，
+    关键词可能被行内标签拆开（如 hello <em>world</em>），才清理整篇后再找。
+    """
     if not content_text:
         return ""
     
-    # 移除HTML标签
-    import re
-    clean_text = re.sub(r'<[^>]+>', '', content_text)
-    
-    if not search_term:
-        return clean_text[:max_length] + "..." if len(clean_text) > max_length else clean_text
-    
-    # 查找关键词位置
-    term_pos = clean_text.lower().find(search_term.lower())
-    if term_pos == -1:
-        return clean_text[:max_length] + "..." if len(clean_text) > max_length else clean_text
+    length = len(content_text)
+    has_tags = '<' in content_text
+    match = pattern.search(content_text)
+    strip_all = False
+    
+    if match:
+        lo = max(0, match.start() - max_length)
+        hi = min(length, match.end() + max_length)
+        text = content_text[lo:hi]
+        if has_tags:
+            text = _strip_tags(text, lo > 0, hi < length)
+        # 关键词位于标签内部时，清理后的窗口里找不到它
+        match = pattern.search(text)
+        strip_all = not match
+    elif has_tags and lead_pattern is not None and lead_pattern.search(content_text):
+        strip_all = True
+    
+    if strip_all:
+        text, lo, hi = _HTML_TAG_RE.sub('', content_text), 0, length
+        match = pattern.search(text)
+    elif not match:
+        # 全文检索按分词命中时原文中通常没有完整关键词，只处理开头一段
+        lo, hi = 0, min(length, max_length * 4)
+        text = content_text[:hi]
+        if has_tags:
+            text = _strip_tags(text, False, hi < length)
+            if len(text) < max_length and hi < length:
+                text, hi = _HTML_TAG_RE.sub('', content_text), length
+    
+    if not match:
+        return text[:max_length] + "..." if len(text) > max_length or hi < length else text
     
     # 围绕关键词生成预览
-    start = max(0, term_pos - 50)
-    end = min(len(clean_text), term_pos + len(search_term) + 50)
+    start = max(0, match.start() - 50)
+    end = min(len(text), match.end() + 50)
     
-    preview = clean_text[start:end]
-    if start > 0:
+    preview = text[start:end]
+    if start > 0 or lo > 0:
         preview = "..." + preview
-    if end < len(clean_text):
+    if end < len(text) or hi < length:
         preview = preview + "..."
     
     return preview
 
 @router.post("/documents/upload", response_model=MessageResponse, status_code=status.HTTP_201_CREATED)
-async def upload_document(
+def upload_document(
     file: UploadFile = File(...),
     title: str = Form(...),
     type: str = Form("markdown"),
@@ -102,33 +316,18 @@ async def upload_document(
     
     # 读取文件内容
     try:
-        content = await file.read()
-        content_str = content.decode('utf-8')
+        content_str = _read_markdown_upload(file, settings.max_upload_size)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"文件读取失败: {str(e)}")
     
     # 生成slug
-    base_slug = title.lower().replace(' ', '-').replace('_', '-')
-    unique_slug = base_slug
-    counter = 1
-    
-    # 检查slug是否已存在
-    while db.query(Document).filter(Document.slug == unique_slug).first():
-        unique_slug = f"{base_slug}-{counter}"
-        counter += 1
+    base_slug = _slugify(title)
+    unique_slug = _allocate_unique_slug(db, base_slug)
     
     # 获取或创建默认用户
-    default_user = db.query(User).filter(User.username == "default_user").first()
-    if not default_user:
-        default_user = User(
-            username="default_user",
-            email="default@example.com",
-            is_admin=False
-        )
-        default_user.set_password("default_password_123")
-        db.add(default_user)
-        db.commit()
-        db.refresh(default_user)
+    default_user_id = _get_system_user_id(db, "default_user")
     
     # 创建文档（不包含content_text字段，因为它是生成列）
     document = Document(
@@ -136,67 +335,88 @@ async def upload_document(
         content={"markdown": content_str, "type": type},  # 将内容存储为JSON格式
         slug=unique_slug,
         status=0,  # draft
-        user_id=default_user.id
+        user_id=default_user_id
     )
     
-    db.add(document)
-    db.commit()
-    db.refresh(document)
+    _commit_with_unique_slug(db, document, base_slug)
     
     return MessageResponse(
         message="文档上传成功",
-        data=DocumentResponse.from_orm(document)
+        data=DocumentResponse.from_orm(_load_relations(db, document))
     )
 
 @router.get("/documents/search", response_model=DocumentSearchResponse)
-async def search_documents(
+def search_documents(
     keyword: str = Query(..., min_length=1, max_length=200, description="搜索关键词"),
     page: int = Query(1, ge=1, description="页码"),
     per_page: int = Query(10, ge=1, le=50, description="每页数量"),
     search_mode: str = Query("basic", pattern="^(basic|fulltext)$", description="搜索模式"),
     highlight: bool = Query(True, description="是否高亮显示匹配文本"),
+    with_total: bool = Query(False, description="是否返回总数（需额外统计全部匹配行）"),
     db: Session = Depends(get_db)
 ):
     """高级搜索文档 - 支持全文搜索和相关度排序"""
-    import time
-    start_time = time.time()
+    start_time = time.perf_counter_ns()
+    total = None
     
     try:
         if search_mode == "fulltext":
-            # 使用MySQL全文搜索
+            against = _fulltext_against(keyword)
+            if not against:
+                search_mode = "basic"
+        
+        if search_mode == "fulltext":
+            # 使用MySQL全文搜索（走 ft_docs_search 全文索引）
             
-            # 构建全文搜索查询
-            search_query = text("""
-                SELECT *, 
-                MATCH(title, excerpt, content_text) AGAINST(:search_term IN NATURAL LANGUAGE MODE) as relevance_score
-                FROM documents 
-                WHERE deleted_at IS NULL 
-                AND MATCH(title, excerpt, content_text) AGAINST(:search_term IN NATURAL LANGUAGE MODE)
-                ORDER BY relevance_score DESC, updated_at DESC
+            # 构建全文搜索查询（ngram 索引只适合布尔模式，见 _fulltext_against）
+            match_expr = "MATCH(d.title, d.excerpt, d.content_text) AGAINST(:search_term IN BOOLEAN MODE)"
+            
+            # 需要总数且支持窗口函数时，总数随本页一起返回，只做一次MATCH扫描
+            window_total = with_total and supports_window_functions(db)
+            total_column = ", COUNT(*) OVER () AS total_rows" if window_total else ""
+            
+            search_query = text(f"""
+                SELECT d.id, d.user_id, d.category_id, d.title, d.excerpt, d.content_text, d.slug,
+                d.status, d.is_pinned, d.created_at, d.updated_at, d.deleted_at,
+                u.username AS author_username, c.name AS category_name,
+                {match_expr} as relevance_score{total_column}
+                FROM documents d
+                LEFT JOIN users u ON u.id = d.user_id
+                LEFT JOIN categories c ON c.id = d.category_id
+                WHERE d.deleted_at IS NULL 
+                AND {match_expr}
+                ORDER BY relevance_score DESC, d.updated_at DESC
                 LIMIT :offset, :limit
             """)
             
-            count_query = text("""
+            # 与列表查询使用相同的MATCH表达式
+            count_query = text(f"""
                 SELECT COUNT(*) as total
-                FROM documents 
-                WHERE deleted_at IS NULL 
-                AND MATCH(title, excerpt, content_text) AGAINST(:search_term IN NATURAL LANGUAGE MODE)
+                FROM documents d
+                WHERE d.deleted_at IS NULL 
+                AND {match_expr}
             """)
             
             # 执行查询
             offset = (page - 1) * per_page
             results = db.execute(search_query, {
-                'search_term': keyword,
+                'search_term': against,
                 'offset': offset,
-                'limit': per_page
+                'limit': per_page + 1
             }).fetchall()
             
-            total_result = db.execute(count_query, {'search_term': keyword}).fetchone()
-            total = total_result.total if total_result else 0
+            if window_total and (results or page == 1):
+                total = results[0].total_rows if results else 0
+            elif with_total:
+                # 不支持窗口函数（MySQL 5.7），或页码超出范围本页为空时，单独统计
+                total_result = db.execute(count_query, {'search_term': against}).fetchone()
+                total = total_result.total if total_result else 0
             
         else:
-            # 基础LIKE搜索（向后兼容）
-            query = db.query(Document).filter(Document.deleted_at.is_(None))
+            # 基础LIKE搜索（向后兼容）：按子串匹配，无法使用索引，
+            # 全文索引按词匹配、结果不完全相同，需要索引加速时请使用 fulltext 模式
+            # 搜索结果只返回摘要和预览，不读取content JSON（高亮仍需要content_text）
+            query = document_query(db).options(defer(Document.content)).filter(Document.deleted_at.is_(None))
             
             search_filter = (
                 Document.title.contains(keyword) |
@@ -211,10 +431,18 @@ async def search_documents(
                 Document.updated_at.desc()
             )
             
-            total = query.count()
-            results = query.offset((page - 1) * per_page).limit(per_page).all()
-        
-        # 处理搜索结果
+            if with_total:
+                total = query.count()
+            results = query.offset((page - 1) * per_page).limit(per_page + 1).all()
+        
+        # 多取的一行只用于判断是否还有下一页
+        has_more = len(results) > per_page
+        results = results[:per_page]
+        
+        # 处理搜索结果，关键词正则每次请求只编译一次
+        pattern = re.compile(re.escape(keyword), re.IGNORECASE)
+        keyword_words = keyword.split()
+        lead_pattern = re.compile(re.escape(keyword_words[0]), re.IGNORECASE) if len(keyword_words) > 1 else None
         search_results = []
         
         if search_mode == "fulltext":
@@ -226,15 +454,15 @@ async def search_documents(
                     'category_id': row.category_id,
                     'title': row.title,
                     'excerpt': row.excerpt,
-                    'content': row.content if isinstance(row.content, dict) else None,
                     'slug': row.slug,
                     'status': row.status,
                     'is_pinned': bool(row.is_pinned),
-                    'author_username': None,  # 需要单独查询
-                    'category_name': None,   # 需要单独查询
-                    'created_at': row.created_at.isoformat() if row.created_at else None,
-                    'updated_at': row.updated_at.isoformat() if row.updated_at else None,
-                    'deleted_at': row.deleted_at.isoformat() if row.deleted_at else None
+                    'author_username': row.author_username,
+                    'category_name': row.category_name,
+                    # 直接传datetime，避免先格式化为字符串再由pydantic解析回来
+                    'created_at': row.created_at,
+                    'updated_at': row.updated_at,
+                    'deleted_at': row.deleted_at
                 }
                 
                 # 创建临时Document对象用于高亮生成
@@ -247,21 +475,21 @@ async def search_documents(
                 result = DocumentSearchResult(
                     **doc_dict,
                     relevance_score=getattr(row, 'relevance_score', None),
-                    highlights=_generate_highlights(temp_doc, keyword) if highlight else None,
-                    content_preview=_generate_content_preview(row.content_text, keyword)
+                    highlights=_generate_highlights(temp_doc, pattern) if highlight else None,
+                    content_preview=_generate_content_preview(row.content_text, pattern, lead_pattern=lead_pattern)
                 )
                 search_results.append(result)
         else:
             for doc in results:
                 result = DocumentSearchResult(
-                    **doc.to_dict(),
-                    highlights=_generate_highlights(doc, keyword) if highlight else None,
-                    content_preview=_generate_content_preview(doc.content_text, keyword)
+                    **doc.to_summary_dict(),
+                    highlights=_generate_highlights(doc, pattern) if highlight else None,
+                    content_preview=_generate_content_preview(doc.content_text, pattern, lead_pattern=lead_pattern)
                 )
                 search_results.append(result)
         
-        search_time = (time.time() - start_time) * 1000
-        pages = (total + per_page - 1) // per_page
+        search_time = (time.perf_counter_ns() - start_time) / 1_000_000
+        pages = (total + per_page - 1) // per_page if total is not None else None
         
         return DocumentSearchResponse(
             items=search_results,
@@ -269,6 +497,7 @@ async def search_documents(
             pages=pages,
             current_page=page,
             per_page=per_page,
+            has_more=has_more,
             keyword=keyword,
             search_mode=search_mode,
             search_time_ms=round(search_time, 2)
@@ -281,15 +510,17 @@ async def search_documents(
         )
 
 @router.get("/documents", response_model=PaginatedResponse)
-async def get_documents(
+def get_documents(
     page: int = Query(1, ge=1, description="页码"),
     per_page: int = Query(10, ge=1, le=100, description="每页数量"),
     status: Optional[int] = Query(None, ge=0, le=2, description="状态筛选"),
     category_id: Optional[int] = Query(None, description="分类ID筛选"),
+    cursor: Optional[str] = Query(None, description="分页游标（上一页返回的next_cursor），传入时忽略page"),
+    with_total: bool = Query(False, description="是否返回总数（需额外统计全部匹配行）"),
     db: Session = Depends(get_db)
 ):
     """获取文档列表"""
-    query = db.query(Document).filter(Document.deleted_at.is_(None))
+    query = document_list_query(db).filter(Document.deleted_at.is_(None))
     
     if status is not None:
         query = query.filter(Document.status == status)
@@ -297,91 +528,91 @@ async def get_documents(
     if category_id is not None:
         query = query.filter(Document.category_id == category_id)
     
-    # 按创建时间倒序排列
-    query = query.order_by(Document.created_at.desc())
-    
-    # 分页
-    total = query.count()
-    documents = query.offset((page - 1) * per_page).limit(per_page).all()
-    
-    pages = (total + per_page - 1) // per_page
-    
-    return PaginatedResponse(
-        items=[DocumentResponse.from_orm(doc) for doc in documents],
-        total=total,
-        pages=pages,
-        current_page=page,
-        per_page=per_page
+    # 按创建时间倒序排列并分页
+    return paginate_documents(query, page, per_page, cursor, with_total)
+
+def _document_version(document: Document) -> int:
+    """文档响应内容的CRC32，用作ETag版本号
+    
+    updated_at 在MySQL DATETIME中只精确到秒，同一秒内的两次保存无法区分，
+    因此直接对响应中会变化的字段取校验值。
+    """
+    parts = (
+        document.title, document.slug, document.excerpt or '',
+        document.status, int(bool(document.is_pinned)),
+        document.category_id or '', document.category.name if document.category else '',
+        document.author.username if document.author else '',
+        document.updated_at.isoformat() if document.updated_at else '',
     )
+    version = zlib.crc32('\x00'.join(str(part) for part in parts).encode())
+    return zlib.crc32(orjson.dumps(document.content, option=orjson.OPT_SORT_KEYS), version)
 
 @router.get("/documents/{document_id}", response_model=DocumentResponse)
-async def get_document(document_id: int, db: Session = Depends(get_db)):
-    """获取单个文档"""
-    document = db.query(Document).filter(
-        Document.id == document_id,
-        Document.deleted_at.is_(None)
-    ).first()
+def get_document(
+    document_id: int,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db)
+):
+    """获取单个文档（支持 ETag / Last-Modified 条件请求）"""
+    # lambda_stmt 按lambda缓存构建好的语句和编译结果，document_id 作为绑定参数传入
+    stmt = lambda_stmt(lambda: select(Document).options(
+        selectinload(Document.author),
+        selectinload(Document.category)
+    ).where(Document.id == document_id, Document.deleted_at.is_(None)))
+    document = db.execute(stmt).scalars().first()
     
     if not document:
         raise HTTPException(status_code=404, detail="文档不存在")
     
+    # 客户端已有最新版本时直接返回304，省去序列化和正文传输
+    etag = weak_etag(document.id, _document_version(document))
+    if is_not_modified(request, etag, document.updated_at):
+        return not_modified_response(etag, document.updated_at)
+    
+    set_validators(response, etag, document.updated_at)
     return DocumentResponse.from_orm(document)
 
 @router.post("/documents", response_model=MessageResponse, status_code=status.HTTP_201_CREATED)
-async def create_document(
+def create_document(
     document_data: DocumentCreate,
     db: Session = Depends(get_db)
 ):
     """创建文档 - 个人使用版本，无需认证"""
     try:
         # 获取或创建默认用户
-        default_user = db.query(User).filter(User.username == "default_user").first()
-        if not default_user:
-            default_user = User(
-                username="default_user",
-                email="default@example.com",
-                is_admin=False
-            )
-            default_user.set_password("default_password_123")
-            db.add(default_user)
-            db.commit()
-            db.refresh(default_user)
+        default_user_id = _get_system_user_id(db, "default_user")
         
         # 生成唯一的slug（如果没有提供）
+        base_slug = None
+        doc_data = document_data.dict()
         if not document_data.slug:
-            base_slug = document_data.title.lower().replace(' ', '-').replace('_', '-')
-            unique_slug = base_slug
-            counter = 1
-            
-            # 检查slug是否已存在
-            while db.query(Document).filter(Document.slug == unique_slug).first():
-                unique_slug = f"{base_slug}-{counter}"
-                counter += 1
-            
-            # 创建文档数据副本并更新slug
-            doc_data = document_data.dict()
-            doc_data['slug'] = unique_slug
-        else:
-            doc_data = document_data.dict()
+            base_slug = _slugify(document_data.title)
+            doc_data['slug'] = _allocate_unique_slug(db, base_slug)
         
         # 创建文档（排除content_text字段，因为它是生成列）
         doc_data.pop('content_text', None)  # 移除content_text字段
+        now = utcnow()
         document = Document(
             **doc_data,
-            user_id=default_user.id,
-            created_at=datetime.now(timezone.utc),
-            updated_at=datetime.now(timezone.utc)
+            user_id=default_user_id,
+            created_at=now,
+            updated_at=now
         )
         
-        db.add(document)
-        db.commit()
-        db.refresh(document)
+        if base_slug is not None:
+            _commit_with_unique_slug(db, document, base_slug)
+        else:
+            db.add(document)
+            db.commit()
         
         return MessageResponse(
             message="文档创建成功",
-            data=DocumentResponse.from_orm(document)
+            data=DocumentResponse.from_orm(_load_relations(db, document))
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(
@@ -390,7 +621,7 @@ async def create_document(
         )
 
 @router.put("/documents/{document_id}", response_model=MessageResponse)
-async def update_document(
+def update_document(
     document_id: int,
     document_update: DocumentUpdate,
     db: Session = Depends(get_db)
@@ -410,30 +641,19 @@ async def update_document(
         
         # 如果更新了标题，检查是否需要更新slug
         if 'title' in update_data and not update_data.get('slug'):
-            base_slug = update_data['title'].lower().replace(' ', '-').replace('_', '-')
-            unique_slug = base_slug
-            counter = 1
-            
-            # 检查slug是否已存在（排除当前文档）
-            while db.query(Document).filter(
-                Document.slug == unique_slug,
-                Document.id != document_id
-            ).first():
-                unique_slug = f"{base_slug}-{counter}"
-                counter += 1
-            
-            update_data['slug'] = unique_slug
+            base_slug = _slugify(update_data['title'])
+            # 排除当前文档，标题不变时保留原slug
+            update_data['slug'] = _allocate_unique_slug(db, base_slug, exclude_id=document_id)
         
         for field, value in update_data.items():
             setattr(document, field, value)
         
-        document.updated_at = datetime.now(timezone.utc)
+        document.updated_at = utcnow()
         db.commit()
-        db.refresh(document)
         
         return MessageResponse(
             message="文档更新成功",
-            data=DocumentResponse.from_orm(document)
+            data=DocumentResponse.from_orm(_load_relations(db, document))
         )
         
     except HTTPException:
@@ -446,23 +666,22 @@ async def update_document(
         )
 
 @router.delete("/documents/{document_id}", response_model=MessageResponse)
-async def delete_document(
+def delete_document(
     document_id: int,
     db: Session = Depends(get_db)
 ):
     """删除文档（软删除）- 个人使用版本，无需认证"""
     try:
-        document = db.query(Document).filter(
+        # 软删除：直接按条件更新，影响行数为0说明文档不存在，无需先读出整行
+        now = utcnow()
+        deleted = db.query(Document).filter(
             Document.id == document_id,
             Document.deleted_at.is_(None)
-        ).first()
+        ).update({Document.deleted_at: now, Document.updated_at: now}, synchronize_session=False)
         
-        if not document:
+        if not deleted:
             raise HTTPException(status_code=404, detail="文档不存在")
         
-        # 软删除
-        document.deleted_at = datetime.now(timezone.utc)
-        document.updated_at = datetime.now(timezone.utc)
         db.commit()
         
         return MessageResponse(message="文档删除成功")
@@ -477,25 +696,28 @@ async def delete_document(
         )
 
 @router.post("/documents/{document_id}/publish", response_model=MessageResponse)
-async def publish_document(
+def publish_document(
     document_id: int,
     db: Session = Depends(get_db)
 ):
     """发布文档 - 个人使用版本，无需认证"""
     try:
-        document = db.query(Document).filter(
+        # 只读取需要判断的列，不加载正文
+        current_status = db.query(Document.status).filter(
             Document.id == document_id,
             Document.deleted_at.is_(None)
-        ).first()
+        ).scalar()
         
-        if not document:
+        if current_status is None:
             raise HTTPException(status_code=404, detail="文档不存在")
         
-        if document.status == 1:
+        if current_status == 1:
             return MessageResponse(message="文档已经是发布状态")
         
-        document.status = 1  # published
-        document.updated_at = datetime.now(timezone.utc)
+        db.query(Document).filter(Document.id == document_id).update(
+            {Document.status: 1, Document.updated_at: utcnow()},  # published
+            synchronize_session=False
+        )
         db.commit()
         
         return MessageResponse(message="文档发布成功")
@@ -510,26 +732,30 @@ async def publish_document(
         )
 
 @router.post("/documents/{document_id}/pin", response_model=MessageResponse)
-async def toggle_pin_document(
+def toggle_pin_document(
     document_id: int,
     db: Session = Depends(get_db)
 ):
     """切换文档置顶状态 - 个人使用版本，无需认证"""
     try:
-        document = db.query(Document).filter(
+        # 只读取置顶状态，不加载正文
+        is_pinned = db.query(Document.is_pinned).filter(
             Document.id == document_id,
             Document.deleted_at.is_(None)
-        ).first()
+        ).scalar()
         
-        if not document:
+        if is_pinned is None:
             raise HTTPException(status_code=404, detail="文档不存在")
         
-        document.is_pinned = not document.is_pinned
-        document.updated_at = datetime.now(timezone.utc)
+        is_pinned = not is_pinned
+        db.query(Document).filter(Document.id == document_id).update(
+            {Document.is_pinned: is_pinned, Document.updated_at: utcnow()},
+            synchronize_session=False
+        )
         db.commit()
         
         return MessageResponse(
-            message=f"文档已{'置顶' if document.is_pinned else '取消置顶'}"
+            message=f"文档已{'置顶' if is_pinned else '取消置顶'}"
         )
         
     except HTTPException:
@@ -542,34 +768,17 @@ async def toggle_pin_document(
         )
 
 @router.post("/documents/plugin", response_model=MessageResponse, status_code=status.HTTP_201_CREATED)
-async def create_document_from_plugin(
+def create_document_from_plugin(
     document_data: DocumentCreate,
     db: Session = Depends(get_db)
 ):
     """从Chrome插件创建文档（无需认证）"""
-    # 获取或创建默认用户
-    default_user = db.query(User).filter(User.username == "chrome_plugin_user").first()
-    if not default_user:
-        # 如果默认用户不存在，创建一个
-        default_user = User(
-            username="chrome_plugin_user",
-            email="chrome_plugin@example.com",
-            is_admin=False
-        )
-        default_user.set_password("chrome_plugin_password_123")
-        db.add(default_user)
-        db.commit()
-        db.refresh(default_user)
+    # 获取或创建默认用户（只在缓存未命中时查询）
+    plugin_user_id = _get_system_user_id(db, "chrome_plugin_user")
     
     # 生成唯一的slug
     base_slug = document_data.slug or document_data.title.lower().replace(' ', '-')
-    unique_slug = base_slug
-    counter = 1
-    
-    # 检查slug是否已存在，如果存在则添加数字后缀
-    while db.query(Document).filter(Document.slug == unique_slug).first():
-        unique_slug = f"{base_slug}-{counter}"
-        counter += 1
+    unique_slug = _allocate_unique_slug(db, base_slug)
     
     # 创建文档数据副本并更新slug
     doc_data = document_data.dict()
@@ -578,14 +787,12 @@ async def create_document_from_plugin(
     
     document = Document(
         **doc_data,
-        user_id=default_user.id
+        user_id=plugin_user_id
     )
     
-    db.add(document)
-    db.commit()
-    db.refresh(document)
+    _commit_with_unique_slug(db, document, base_slug)
     
     return MessageResponse(
         message="文档创建成功",
-        data=DocumentResponse.from_orm(document)
+        data=DocumentResponse.from_orm(_load_relations(db, document))
     )
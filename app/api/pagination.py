@@ -0,0 +1,102 @@
+"""分页相关：键集分页游标的编码与解析，以及文档列表查询与分页（文档、分类路由共用）"""
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, List, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import Query as ORMQuery, Session
+
+from app.models import Category, Document, User
+from app.schemas import DOCUMENT_LIST_ADAPTER, PaginatedResponse
+
+
+def encode_cursor(*values: Any) -> str:
+    """把排序键编码为不透明的游标字符串"""
+    raw = json.dumps([value.isoformat() if isinstance(value, datetime) else value for value in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """解析游标，返回编码时的排序键列表（datetime 以ISO字符串返回）"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        values = None
+    
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="无效的分页游标")
+    
+    return values
+
+def document_list_query(db: Session) -> ORMQuery:
+    """文档列表查询：只选取 DocumentListItem 需要的列，作者名和分类名通过JOIN一并取出
+    
+    结果是列元组（Row）而非ORM对象，省去对象实例化和关联预加载的两条 IN 查询；
+    不读取 content / content_text 大字段。
+    """
+    return db.query(
+        Document.id, Document.user_id, Document.category_id, Document.title,
+        Document.excerpt, Document.slug, Document.status, Document.is_pinned,
+        Document.created_at, Document.updated_at, Document.deleted_at,
+        User.username.label('author_username'),
+        Category.name.label('category_name')
+    ).join(User, User.id == Document.user_id).outerjoin(Category, Category.id == Document.category_id)
+
+def paginate_documents(
+    query: ORMQuery,
+    page: int,
+    per_page: int,
+    cursor: Optional[str] = None,
+    with_total: bool = False
+) -> PaginatedResponse:
+    """按 (created_at DESC, id DESC) 分页文档列表
+    
+    传入游标时走键集分页，从索引直接定位，不计算总数；
+    否则沿用页码分页（OFFSET 随页码增大而变慢，仅适合浅页）。
+    总数需要扫描全部匹配行，只在 with_total 时作为标量子查询随本页一起返回。
+    多取一行用于判断是否还有下一页，并据本页最后一条生成下一页游标。
+    """
+    if cursor:
+        created_at, last_id = decode_cursor(cursor, 2)
+        try:
+            after = (datetime.fromisoformat(created_at), int(last_id))
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="无效的分页游标")
+        
+        query = query.filter(tuple_(Document.created_at, Document.id) < after)
+        query = query.order_by(Document.created_at.desc(), Document.id.desc())
+        documents = query.limit(per_page + 1).all()
+        total = None
+        pages = None
+    elif with_total:
+        total_subquery = query.with_entities(func.count(Document.id)).scalar_subquery()
+        rows = query.add_columns(total_subquery.label('total')).order_by(
+            Document.created_at.desc(), Document.id.desc()
+        ).offset((page - 1) * per_page).limit(per_page + 1).all()
+        documents = rows
+        # 页码超出范围时本页为空，只能单独统计
+        total = rows[0].total if rows else (query.count() if page > 1 else 0)
+        pages = (total + per_page - 1) // per_page
+    else:
+        documents = query.order_by(
+            Document.created_at.desc(), Document.id.desc()
+        ).offset((page - 1) * per_page).limit(per_page + 1).all()
+        total = None
+        pages = None
+    
+    has_more = len(documents) > per_page
+    documents = documents[:per_page]
+    next_cursor = encode_cursor(documents[-1].created_at, documents[-1].id) if has_more else None
+    
+    return PaginatedResponse(
+        items=DOCUMENT_LIST_ADAPTER.validate_python(documents, from_attributes=True),
+        total=total,
+        pages=pages,
+        current_page=page,
+        per_page=per_page,
+        has_more=has_more,
+        next_cursor=next_cursor
+    )
@@ -1,43 +1,58 @@
-from datetime import datetime
-from typing import List
+from typing import List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, defer
 
+from app.api.pagination import decode_cursor, encode_cursor
 from app.auth import get_current_admin_user, get_current_user
 from app.database import get_db
-from app.models import User
-from app.schemas import (MessageResponse, PaginatedResponse, PaginationParams,
-                         UserResponse, UserUpdate)
+from app.models import User, utcnow
+from app.schemas import (USER_LIST_ADAPTER, MessageResponse, PaginatedResponse,
+                         PaginationParams, UserResponse, UserUpdate)
 
 router = APIRouter()
 
 @router.get("/users", response_model=PaginatedResponse)
-async def get_users(
+def get_users(
     page: int = Query(1, ge=1, description="页码"),
     per_page: int = Query(20, ge=1, le=100, description="每页数量"),
+    cursor: Optional[str] = Query(None, description="分页游标（上一页返回的next_cursor），传入时忽略page"),
+    with_total: bool = Query(False, description="是否返回总数（需额外统计全部匹配行）"),
     current_user: User = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
     """获取用户列表（仅管理员）"""
-    query = db.query(User)
-    
-    # 分页
-    total = query.count()
-    users = query.offset((page - 1) * per_page).limit(per_page).all()
-    
-    pages = (total + per_page - 1) // per_page
+    # 列表不返回密码哈希，无需读取
+    query = db.query(User).options(defer(User.password_hash)).order_by(User.id)
+    
+    if cursor:
+        # 键集分页：按主键定位，不计算总数
+        (last_id,) = decode_cursor(cursor, 1)
+        if not isinstance(last_id, int):
+            raise HTTPException(status_code=400, detail="无效的分页游标")
+        users = query.filter(User.id > last_id).limit(per_page + 1).all()
+        total = None
+        pages = None
+    else:
+        total = query.count() if with_total else None
+        pages = (total + per_page - 1) // per_page if total is not None else None
+        users = query.offset((page - 1) * per_page).limit(per_page + 1).all()
+    
+    has_more = len(users) > per_page
+    users = users[:per_page]
     
     return PaginatedResponse(
-        items=[UserResponse.from_orm(user) for user in users],
+        items=USER_LIST_ADAPTER.validate_python(users, from_attributes=True),
         total=total,
         pages=pages,
         current_page=page,
-        per_page=per_page
+        per_page=per_page,
+        has_more=has_more,
+        next_cursor=encode_cursor(users[-1].id) if has_more else None
     )
 
 @router.get("/users/{user_id}", response_model=UserResponse)
-async def get_user(
+def get_user(
     user_id: int,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -53,7 +68,7 @@ async def get_user(
     return UserResponse.from_orm(user)
 
 @router.put("/users/{user_id}", response_model=MessageResponse)
-async def update_user(
+def update_user(
     user_id: int,
     user_update: UserUpdate,
     current_user: User = Depends(get_current_user),
@@ -73,9 +88,8 @@ async def update_user(
         if value is not None:
             setattr(user, field, value)
     
-    user.updated_at = datetime.utcnow()
+    user.updated_at = utcnow()
     db.commit()
-    db.refresh(user)
     
     return MessageResponse(
         message="用户信息更新成功",
@@ -83,7 +97,7 @@ async def update_user(
     )
 
 @router.delete("/users/{user_id}", response_model=MessageResponse)
-async def delete_user(
+def delete_user(
     user_id: int,
     current_user: User = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
@@ -102,7 +116,7 @@ async def delete_user(
     return MessageResponse(message="用户删除成功")
 
 @router.post("/users/{user_id}/toggle-admin", response_model=MessageResponse)
-async def toggle_admin(
+def toggle_admin(
     user_id: int,
     current_user: User = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
@@ -116,7 +130,7 @@ async def toggle_admin(
         raise HTTPException(status_code=404, detail="用户不存在")
     
     user.is_admin = not user.is_admin
-    user.updated_at = datetime.utcnow()
+    user.updated_at = utcnow()
     db.commit()
     
     return MessageResponse(
@@ -124,7 +138,7 @@ async def toggle_admin(
     )
 
 @router.post("/users/plugin-default", response_model=MessageResponse, status_code=status.HTTP_201_CREATED)
-async def create_plugin_default_user(db: Session = Depends(get_db)):
+def create_plugin_default_user(db: Session = Depends(get_db)):
     """创建Chrome插件的默认用户（无需认证）"""
     # 检查是否已存在默认用户
     default_user = db.query(User).filter(User.username == "chrome_plugin_user").first()
@@ -144,7 +158,6 @@ async def create_plugin_default_user(db: Session = Depends(get_db)):
     
     db.add(default_user)
     db.commit()
-    db.refresh(default_user)
     
     return MessageResponse(
         message="默认用户创建成功",
@@ -3,15 +3,13 @@ from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
-from passlib.context import CryptContext
+from sqlalchemy import lambda_stmt, select
 from sqlalchemy.orm import Session
 from config import settings
 from app.database import get_db
 from app.models import User
 from app.schemas import TokenData
-
-# 密码加密上下文
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.security import get_pwd_context
 
 # HTTP Bearer认证
 security = HTTPBearer()
@@ -58,7 +56,9 @@ def get_current_user(
     token = credentials.credentials
     token_data = verify_token(token)
     
-    user = db.query(User).filter(User.id == token_data.user_id).first()
+    # 每个认证请求都会执行的查询，用 lambda_stmt 缓存语句构建与编译
+    user_id = token_data.user_id
+    user = db.execute(lambda_stmt(lambda: select(User).where(User.id == user_id))).scalars().first()
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -84,8 +84,8 @@ def get_current_admin_user(current_user: User = Depends(get_current_user)) -> Us
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """验证密码"""
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     """获取密码哈希"""
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
@@ -1,18 +1,26 @@
-from sqlalchemy import create_engine
+import orjson
+from sqlalchemy import create_engine, inspect
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from config import settings
 
 # 创建数据库引擎
 engine = create_engine(
     settings.database_url,
     echo=settings.debug,  # 在调试模式下显示SQL语句
-    pool_pre_ping=True,   # 连接池预检查
-    pool_recycle=3600,    # 连接回收时间
+    pool_size=settings.db_pool_size,          # 常驻连接数
+    max_overflow=settings.db_max_overflow,    # 高峰期额外连接数
+    pool_timeout=settings.db_pool_timeout,    # 获取连接的等待超时
+    pool_pre_ping=settings.db_pool_pre_ping,  # 连接池预检查
+    pool_use_lifo=True,                       # 优先复用最近归还的连接，空闲连接可按 pool_recycle 自然淘汰
+    pool_recycle=settings.db_pool_recycle,    # 连接回收时间
+    json_serializer=lambda obj: orjson.dumps(obj).decode(),  # JSON列使用orjson编解码
+    json_deserializer=orjson.loads,
 )
 
 # 创建会话工厂
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# expire_on_commit=False: 提交后保留已写入的属性值，序列化响应时无需再 SELECT 一次
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 # 创建基础模型类
 Base = declarative_base()
@@ -25,10 +33,42 @@ def get_db():
     finally:
         db.close()
 
+def _load_models():
+    """导入模型模块，确保所有表都已注册到 Base.metadata"""
+    import app.models  # noqa: F401
+
 def create_tables():
-    """创建所有表"""
-    Base.metadata.create_all(bind=engine)
+    """创建所有表
+    
+    MySQL上在建表的会话里关闭全文停用词：停用词表在建全文索引时与索引绑定，
+    ngram 分词器会丢弃所有包含停用词的分词（见 models 中 ft_docs_search 的说明）。
+    """
+    _load_models()
+    with engine.begin() as conn:
+        if conn.dialect.name == "mysql":
+            conn.exec_driver_sql("SET SESSION innodb_ft_enable_stopword = OFF")
+        Base.metadata.create_all(bind=conn)
 
 def drop_tables():
     """删除所有表"""
+    _load_models()
     Base.metadata.drop_all(bind=engine)
+
+def check_tables() -> list:
+    """检查数据库中是否缺少模型对应的表，返回缺失的表名（只需一次查询）"""
+    _load_models()
+    existing = set(inspect(engine).get_table_names())
+    return [name for name in Base.metadata.tables if name not in existing]
+
+def supports_window_functions(db: Session) -> bool:
+    """当前数据库是否支持窗口函数（MySQL 8.0+ / MariaDB 10.2+）
+    
+    服务器版本在连接建立时由方言读取，这里不额外查询数据库。
+    """
+    dialect = db.connection().dialect
+    if dialect.name not in ("mysql", "mariadb"):
+        return False
+    version = dialect.server_version_info or ()
+    if getattr(dialect, "is_mariadb", False):
+        return version >= (10, 2)
+    return version >= (8, 0)
@@ -0,0 +1,24 @@
+"""数据库管理命令
+
+用法:
+    python -m app.manage migrate    创建所有缺失的数据库表
+"""
+import sys
+
+from app.database import create_tables
+
+
+def main(argv=None) -> int:
+    """命令行入口"""
+    args = sys.argv[1:] if argv is None else argv
+    
+    if args[:1] == ["migrate"]:
+        create_tables()
+        print("数据库表创建完成")
+        return 0
+    
+    print(__doc__)
+    return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
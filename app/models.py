@@ -1,15 +1,23 @@
 from datetime import datetime, timezone
 from typing import List, Optional
 
-from passlib.hash import bcrypt
 from sqlalchemy import (BigInteger, Boolean, DateTime, ForeignKey,
                         Index, Integer, String, Text, Computed)
 from sqlalchemy.dialects.mysql import LONGTEXT
 from sqlalchemy.dialects.mysql import JSON
-from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
-Base = declarative_base()
+from app.database import Base
+from app.security import get_pwd_context
+
+def utcnow() -> datetime:
+    """时间列的默认值/更新值
+    
+    与数据库读回的值保持一致：不带时区的UTC时间，截断到秒（DATETIME 只保存到秒）。
+    会话 expire_on_commit=False，写接口直接返回内存中的值，两者不一致会导致
+    创建/更新接口与查询接口返回的时间格式不同。
+    """
+    return datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
 
 class User(Base):
     """用户模型"""
@@ -20,19 +28,22 @@ class User(Base):
     email: Mapped[str] = mapped_column(String(120), unique=True, nullable=False)
     password_hash: Mapped[str] = mapped_column(String(255), nullable=False)
     is_admin: Mapped[bool] = mapped_column(Boolean, default=False)
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc))
-    updated_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=utcnow)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=utcnow, onupdate=utcnow)
     
     # 关联关系
     documents: Mapped[List["Document"]] = relationship("Document", back_populates="author")
     
     def set_password(self, password: str) -> None:
         """设置密码"""
-        self.password_hash = bcrypt.hash(password)
+        self.password_hash = get_pwd_context().hash(password)
     
     def check_password(self, password: str) -> bool:
-        """验证密码"""
-        return bcrypt.verify(password, self.password_hash)
+        """验证密码；旧算法（bcrypt）的哈希验证通过后替换为新哈希，由调用方提交"""
+        valid, new_hash = get_pwd_context().verify_and_update(password, self.password_hash)
+        if valid and new_hash:
+            self.password_hash = new_hash
+        return valid
     
     def to_dict(self) -> dict:
         """转换为字典"""
@@ -52,7 +63,7 @@ class Category(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     name: Mapped[str] = mapped_column(String(50), unique=True, nullable=False)
     description: Mapped[Optional[str]] = mapped_column(String(200))
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc))
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=utcnow)
     
     # 关联关系
     documents: Mapped[List["Document"]] = relationship("Document", back_populates="category")
@@ -75,45 +86,80 @@ class Document(Base):
     category_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey('categories.id'))
     title: Mapped[str] = mapped_column(String(255), nullable=False, comment='冗余字段，需与content中的H1标题同步')
     excerpt: Mapped[Optional[str]] = mapped_column(String(500), comment='冗余字段，自动从content中提取的文本摘要')
-    content: Mapped[Optional[dict]] = mapped_column(JSON, comment='存储文档内容的块结构JSON对象')
+    content: Mapped[Optional[dict]] = mapped_column(JSON(none_as_null=True), comment='存储文档内容的块结构JSON对象（None存为SQL NULL）')
     content_text: Mapped[Optional[str]] = mapped_column(
         LONGTEXT, 
-        Computed("(case when (json_valid(`content`) and (json_extract(`content`,'$.markdown') is not null)) then json_unquote(json_extract(`content`,'$.markdown')) when (json_valid(`content`) and (json_extract(`content`,'$.html') is not null)) then json_unquote(json_extract(`content`,'$.html')) else NULL end)"),
-        comment='从content JSON中提取的文本内容，用于全文搜索（生成列）'
+        Computed("(case when (json_valid(`content`) and (json_extract(`content`,'$.markdown') is not null)) then json_unquote(json_extract(`content`,'$.markdown')) when (json_valid(`content`) and (json_extract(`content`,'$.html') is not null)) then json_unquote(json_extract(`content`,'$.html')) else NULL end)", persisted=True),
+        comment='从content JSON中提取的文本内容，用于全文搜索（存储生成列，InnoDB不支持在虚拟生成列上建全文索引）'
     )
     slug: Mapped[Optional[str]] = mapped_column(String(255), unique=True)
     status: Mapped[int] = mapped_column(Integer, default=0, comment='0:draft, 1:published, 2:archived')
     is_pinned: Mapped[bool] = mapped_column(Boolean, default=False)
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc))
-    updated_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=utcnow)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=utcnow, onupdate=utcnow)
     deleted_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
     
     # 关联关系
-    author: Mapped[User] = relationship("User", back_populates="documents")
-    category: Mapped[Optional[Category]] = relationship("Category", back_populates="documents")
+    author: Mapped[User] = relationship("User", back_populates="documents", lazy="raise")
+    category: Mapped[Optional[Category]] = relationship("Category", back_populates="documents", lazy="raise")
     
-    def to_dict(self) -> dict:
-        """转换为字典"""
+    @property
+    def author_username(self) -> Optional[str]:
+        """作者用户名（author 为 lazy="raise"，查询时须预加载，避免逐行懒加载）"""
+        return self.author.username if self.author else None
+    
+    @property
+    def category_name(self) -> Optional[str]:
+        """分类名称（category 为 lazy="raise"，查询时须预加载，避免逐行懒加载）"""
+        return self.category.name if self.category else None
+    
+    def to_summary_dict(self) -> dict:
+        """转换为不含content正文的字典（列表/搜索结果使用，可配合 defer(Document.content) 查询）"""
         return {
             'id': self.id,
             'user_id': self.user_id,
             'category_id': self.category_id,
             'title': self.title,
             'excerpt': self.excerpt,
-            'content': self.content,
             'slug': self.slug,
             'status': self.status,
             'is_pinned': self.is_pinned,
-            'author_username': self.author.username if self.author else None,
-            'category_name': self.category.name if self.category else None,
+            'author_username': self.author_username,
+            'category_name': self.category_name,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
             'deleted_at': self.deleted_at.isoformat() if self.deleted_at else None
         }
+    
+    def to_dict(self) -> dict:
+        """转换为字典（含content正文）"""
+        data = self.to_summary_dict()
+        data['content'] = self.content
+        return data
 
-# 创建索引
-Index('idx_user_id_status', Document.user_id, Document.status)
-Index('idx_category_id', Document.category_id)
-Index('idx_slug', Document.slug)
-Index('idx_created_at', Document.created_at)
-Index('idx_is_pinned', Document.is_pinned)
+# 创建索引（slug 的 UNIQUE 约束本身即是B树索引，无需再单独建索引）
+# user_id 外键所需的索引（目前没有按作者或置顶状态筛选的查询，不为其建复合索引）
+Index('idx_user_id', Document.user_id)
+# 列表查询的复合索引：等值条件在前，排序列 (created_at DESC, id DESC) 在后，
+# 分页直接按索引顺序读取，无需filesort。MySQL不支持部分索引，deleted_at 作为等值列参与索引
+# 分类文档列表 / 按分类筛选: category_id = ? [AND status = ?] AND deleted_at IS NULL
+Index('idx_docs_live', Document.category_id, Document.status, Document.deleted_at,
+      Document.created_at.desc(), Document.id.desc())
+# 按状态筛选的文档列表: status = ? AND deleted_at IS NULL
+Index('idx_docs_status_created', Document.status, Document.deleted_at,
+      Document.created_at.desc(), Document.id.desc())
+# 全部文档列表: deleted_at IS NULL
+Index('idx_docs_deleted_created', Document.deleted_at, Document.created_at.desc(), Document.id.desc())
+# 全文索引，供 MATCH ... AGAINST 搜索使用；ngram 分词器按 ngram_token_size（默认2）切分，中英文都能检索。
+# ngram 会丢弃所有包含停用词的分词，默认停用词表含 a、i、in、at、is 等，
+# 英文大部分二元分词因此进不了索引（如 main 的 ma/ai/in 全被丢弃，无法检索）。
+# 停用词表在建索引时与索引绑定，必须在关闭停用词（innodb_ft_enable_stopword=OFF，create_tables 已在会话中设置）
+# 或指定自定义停用词表（innodb_ft_server_stopword_table）的情况下建索引。
+# 已有数据库（create_all 不修改已有表）需在同一会话中手动重建：
+#   SET SESSION innodb_ft_enable_stopword = OFF;
+#   ALTER TABLE documents DROP INDEX ft_docs_search;  -- 索引不存在时跳过
+#   ALTER TABLE documents ADD FULLTEXT INDEX ft_docs_search (title, excerpt, content_text) WITH PARSER ngram;
+# 自然语言模式下 ngram 把 hello 拆成 he|el|ll|lo 的并集，几乎匹配所有英文文档，
+# 因此查询一律使用布尔模式（见 documents._fulltext_against）。
+Index('ft_docs_search', Document.title, Document.excerpt, Document.content_text,
+      mysql_prefix='FULLTEXT', mysql_with_parser='ngram')
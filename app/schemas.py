@@ -1,23 +1,26 @@
 from datetime import datetime
-from typing import Optional, List, Dict, Any
-from pydantic import BaseModel, Field, EmailStr
+from typing import Annotated, Optional, List, Dict, Any
+from pydantic import BaseModel, ConfigDict, Field, StringConstraints, TypeAdapter
 
 # 基础模型
 class BaseSchema(BaseModel):
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
+
+# 邮箱格式只做基本校验，由pydantic-core的正则直接完成（不依赖email-validator）
+EMAIL_PATTERN = r'^[^@\s]+@[^@\s]+\.[^@\s]+$'
+Email = Annotated[str, StringConstraints(strip_whitespace=True, max_length=120, pattern=EMAIL_PATTERN)]
 
 # 用户相关模型
 class UserBase(BaseSchema):
     username: str = Field(..., min_length=3, max_length=80, description="用户名")
-    email: EmailStr = Field(..., description="邮箱地址")
+    email: Email = Field(..., description="邮箱地址")
 
 class UserCreate(UserBase):
     password: str = Field(..., min_length=6, description="密码")
 
 class UserUpdate(BaseSchema):
     username: Optional[str] = Field(None, min_length=3, max_length=80)
-    email: Optional[EmailStr] = None
+    email: Optional[Email] = None
     password: Optional[str] = Field(None, min_length=6)
 
 class UserResponse(UserBase):
@@ -73,6 +76,22 @@ class DocumentResponse(DocumentBase):
     updated_at: datetime
     deleted_at: Optional[datetime] = None
 
+class DocumentListItem(BaseSchema):
+    """文档列表项（不含content正文，详情通过单个文档接口获取）"""
+    id: int
+    user_id: int
+    category_id: Optional[int] = None
+    title: str
+    excerpt: Optional[str] = None
+    slug: Optional[str] = None
+    status: int
+    is_pinned: bool
+    author_username: Optional[str] = None
+    category_name: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    deleted_at: Optional[datetime] = None
+
 # 认证相关模型
 class Token(BaseSchema):
     access_token: str
@@ -93,10 +112,12 @@ class PaginationParams(BaseSchema):
 
 class PaginatedResponse(BaseSchema):
     items: List[Any]
-    total: int
-    pages: int
+    total: Optional[int] = Field(None, description="总数（with_total=true 且非游标分页时返回）")
+    pages: Optional[int] = Field(None, description="总页数（with_total=true 且非游标分页时返回）")
     current_page: int
     per_page: int
+    has_more: Optional[bool] = Field(None, description="是否还有下一页")
+    next_cursor: Optional[str] = Field(None, description="下一页游标（传给cursor参数）")
 
 # 搜索模型
 class DocumentSearchParams(BaseSchema):
@@ -118,10 +139,11 @@ class DocumentSearchResult(DocumentResponse):
 
 class DocumentSearchResponse(BaseSchema):
     items: List[DocumentSearchResult]
-    total: int
-    pages: int
+    total: Optional[int] = Field(None, description="总数（with_total=true 时返回）")
+    pages: Optional[int] = Field(None, description="总页数（with_total=true 时返回）")
     current_page: int
     per_page: int
+    has_more: Optional[bool] = Field(None, description="是否还有下一页")
     keyword: str
     search_mode: str
     search_time_ms: Optional[float] = Field(None, description="搜索耗时(毫秒)")
@@ -130,3 +152,8 @@ class DocumentSearchResponse(BaseSchema):
 class MessageResponse(BaseSchema):
     message: str
     data: Optional[Any] = None
+
+# 列表批量转换适配器：整页对象在pydantic-core中一次完成校验，避免逐条 from_orm
+USER_LIST_ADAPTER = TypeAdapter(List[UserResponse])
+CATEGORY_LIST_ADAPTER = TypeAdapter(List[CategoryResponse])
+DOCUMENT_LIST_ADAPTER = TypeAdapter(List[DocumentListItem])
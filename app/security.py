@@ -0,0 +1,17 @@
+from functools import lru_cache
+
+@lru_cache(maxsize=None)
+def get_pwd_context():
+    """密码加密上下文（首次使用时才导入passlib并创建）
+    
+    新密码使用 argon2id；已有的 bcrypt 哈希仍可验证，并在登录成功时自动升级为 argon2id。
+    """
+    from passlib.context import CryptContext
+    return CryptContext(
+        schemes=["argon2", "bcrypt"],
+        deprecated="auto",
+        argon2__type="ID",
+        argon2__time_cost=2,
+        argon2__memory_cost=65536,  # KiB，即 64MB
+        argon2__parallelism=1,
+    )
@@ -7,19 +7,25 @@ FilePath: \markdown-backend\config.py
 Description: 这是默认设置,请设置`customMade`, 打开koroFileHeader查看配置 进行设置: https://github.com/OBKoro1/koro1FileHeader/wiki/%E9%85%8D%E7%BD%AE
 '''
 import os
+from functools import cached_property, lru_cache
 from typing import List
 
 from pydantic import Field
-from pydantic_settings import BaseSettings
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
     """应用配置类"""
     
+    model_config = SettingsConfigDict(env_file=".env", case_sensitive=False)
+    
     # 应用配置
     app_name: str = "Markdown管理后台"
     debug: bool = Field(default=True, description="调试模式")
     secret_key: str = Field(default="dev-secret-key-change-in-production", description="密钥")
+    enable_docs: bool = Field(default=True, description="是否开放API文档(OpenAPI/Swagger/ReDoc)")
+    max_upload_size: int = Field(default=10 * 1024 * 1024, description="上传文件大小上限(字节)")
+    category_cache_ttl: int = Field(default=30, description="分类接口缓存时间(秒)，0表示不缓存")
     
     # 数据库配置 - 建议使用环境变量
     db_host: str = Field(default="rm-bp1ljbjb34n55su6uko.mysql.rds.aliyuncs.com", description="数据库主机")
@@ -28,8 +34,15 @@ class Settings(BaseSettings):
     db_user: str = Field(default="markdown_user", description="数据库用户名")
     db_password: str = Field(default="Syp19960424", description="数据库密码")
     
-    # 数据库连接字符串
-    @property
+    # 数据库连接池配置
+    db_pool_size: int = Field(default=20, description="连接池常驻连接数")
+    db_max_overflow: int = Field(default=10, description="连接池允许的额外连接数")
+    db_pool_timeout: int = Field(default=30, description="获取连接的等待超时(秒)")
+    db_pool_recycle: int = Field(default=3600, description="连接回收时间(秒)")
+    db_pool_pre_ping: bool = Field(default=True, description="取出连接时先探活(每次取连接多一次往返)")
+    
+    # 数据库连接字符串（首次访问时拼接并缓存）
+    @cached_property
     def database_url(self) -> str:
         return f"mysql+pymysql://{self.db_user}:{self.db_password}@{self.db_host}:{self.db_port}/{self.db_name}?charset=utf8mb4"
     
@@ -38,6 +51,9 @@ class Settings(BaseSettings):
     jwt_algorithm: str = Field(default="HS256", description="JWT算法")
     jwt_expiration_hours: int = Field(default=24, description="JWT过期时间(小时)")
     
+    # 管理员引导：注册时自动设为管理员的用户名；为空时第一个注册的用户成为管理员
+    admin_bootstrap_usernames: List[str] = Field(default=[], description="注册即为管理员的用户名")
+    
     # CORS配置 - 添加Chrome扩展支持
     cors_origins: List[str] = Field(
         default=[
@@ -51,10 +67,12 @@ class Settings(BaseSettings):
         ], 
         description="允许的跨域来源"
     )
-    
-    class Config:
-        env_file = ".env"
-        case_sensitive = False
+
+
+@lru_cache(maxsize=None)
+def get_settings() -> Settings:
+    """获取配置实例（只解析一次环境变量和 .env 文件）"""
+    return Settings()
 
 # 创建全局配置实例
-settings = Settings()
\ No newline at end of file
+settings = get_settings()
\ No newline at end of file
@@ -20,6 +20,14 @@ if [ $? -ne 0 ]; then
     exit 1
 fi
 
+echo
+echo "创建数据库表..."
+python3 -m app.manage migrate
+if [ $? -ne 0 ]; then
+    echo "错误: 数据库表创建失败"
+    exit 1
+fi
+
 echo
 echo "启动FastAPI应用..."
 echo "应用将在 http://localhost:8000 启动"
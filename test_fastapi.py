@@ -15,10 +15,13 @@ def test_fastapi_app():
     print("🚀 开始测试FastAPI应用...")
     print("=" * 50)
     
+    # 复用同一个会话，各请求共用连接池中的长连接
+    session = requests.Session()
+    
     try:
         # 测试根路径
         print("1. 测试根路径...")
-        response = requests.get(f"{base_url}/")
+        response = session.get(f"{base_url}/")
         if response.status_code == 200:
             print(f"✅ 根路径正常: {response.json()}")
         else:
@@ -26,7 +29,7 @@ def test_fastapi_app():
         
         # 测试健康检查
         print("\n2. 测试健康检查...")
-        response = requests.get(f"{base_url}/health")
+        response = session.get(f"{base_url}/health")
         if response.status_code == 200:
             print(f"✅ 健康检查正常: {response.json()}")
         else:
@@ -34,7 +37,7 @@ def test_fastapi_app():
         
         # 测试API文档
         print("\n3. 测试API文档...")
-        response = requests.get(f"{base_url}/docs")
+        response = session.get(f"{base_url}/docs")
         if response.status_code == 200:
             print("✅ API文档可访问")
         else:
@@ -42,7 +45,7 @@ def test_fastapi_app():
         
         # 测试分类接口
         print("\n4. 测试分类接口...")
-        response = requests.get(f"{base_url}/api/categories")
+        response = session.get(f"{base_url}/api/categories")
         if response.status_code == 200:
             categories = response.json()
             print(f"✅ 分类接口正常: 获取到 {len(categories)} 个分类")
@@ -59,6 +62,8 @@ def test_fastapi_app():
         print("💡 启动命令: python main.py")
     except Exception as e:
         print(f"❌ 测试异常: {e}")
+    finally:
+        session.close()
 
 if __name__ == "__main__":
     test_fastapi_app()